@@ -9,6 +9,9 @@ if TYPE_CHECKING:
     from nbsafety.types import SupportedIndexType
 
 
+_CHAIN_NODE_TYPES = (ast.Attribute, ast.Subscript, ast.Call)
+
+
 class CallPoint(CommonEqualityMixin):
     def __init__(self, symbol: str):
         self.symbol = symbol
@@ -36,41 +39,54 @@ class AttrSubSymbolChain(CommonEqualityMixin):
         return repr(self.symbols)
 
 
-class GetAttrSubSymbols(ast.NodeVisitor):
+class GetAttrSubSymbols:
+    # each handler records the symbol for its node and returns the next node in the chain (or None to stop)
     def __init__(self):
         self.symbol_chain: List[Union[str, int, Tuple[Union[str, int], ...], CallPoint]] = []
 
     def __call__(self, node: Union[ast.Attribute, ast.Subscript, ast.Call, ast.Name]) -> AttrSubSymbolChain:
-        self.visit(node)
+        cur_node: Optional[ast.AST] = node
+        while cur_node is not None:
+            handler = _CHAIN_HANDLERS.get(type(cur_node), None)
+            if handler is None:
+                # give up
+                break
+            cur_node = handler(self, cur_node)
         self.symbol_chain.reverse()
         return AttrSubSymbolChain(self.symbol_chain)
 
-    def visit_Call(self, node):
+    def visit_Call(self, node) -> Optional[ast.AST]:
         if isinstance(node.func, ast.Attribute):
             self.symbol_chain.append(CallPoint(node.func.attr))
-            self.visit(node.func.value)
+            return node.func.value
         elif isinstance(node.func, ast.Subscript):
-            if isinstance(node.func.slice, ast.Constant):
-                self.symbol_chain.append(CallPoint(str(node.func.slice.value)))
-            elif isinstance(node.func.slice, ast.Index) and isinstance(node.func.slice.value, (ast.Str, ast.Num)):
-                if isinstance(node.func.slice.value, ast.Str):
-                    self.symbol_chain.append(CallPoint(node.func.slice.value.s))
-                else:
-                    self.symbol_chain.append(CallPoint(str(node.func.slice.value.n)))
-                self.visit(node.func.value)
+            func_slice = node.func.slice
+            if isinstance(func_slice, ast.Constant):
+                self.symbol_chain.append(CallPoint(str(func_slice.value)))
+            elif isinstance(func_slice, ast.Index):
+                # ast.Index only wraps the slice on python < 3.9, and newer stubs drop its `value` field
+                slice_value = cast(ast.expr, func_slice.value)  # type: ignore
+                if isinstance(slice_value, ast.Str):
+                    self.symbol_chain.append(CallPoint(cast(str, slice_value.s)))
+                    return node.func.value
+                elif isinstance(slice_value, ast.Num):
+                    self.symbol_chain.append(CallPoint(str(slice_value.n)))
+                    return node.func.value
+            return None
         elif isinstance(node.func, ast.Name):
             self.symbol_chain.append(CallPoint(node.func.id))
+            return None
         elif isinstance(node.func, ast.Call):
             # TODO: handle this case too, e.g. f.g()().h
-            pass
+            return None
         else:
             raise TypeError('invalid type for node.func %s' % node.func)
 
-    def visit_Attribute(self, node):
+    def visit_Attribute(self, node) -> Optional[ast.AST]:
         self.symbol_chain.append(node.attr)
-        self.visit(node.value)
+        return node.value
 
-    def visit_Subscript(self, node):
+    def visit_Subscript(self, node) -> Optional[ast.AST]:
         resolved = resolve_slice_to_constant(node)
         if resolved is not None:
             if isinstance(resolved, ast.Name):
@@ -80,24 +96,28 @@ class GetAttrSubSymbols(ast.NodeVisitor):
                 self.symbol_chain.append(CallPoint(resolved.id))
             else:
                 self.symbol_chain.append(resolved)
-        self.visit(node.value)
+        return node.value
 
-    def visit_Name(self, node):
+    def visit_Name(self, node) -> Optional[ast.AST]:
         self.symbol_chain.append(node.id)
+        return None
+
 
-    def generic_visit(self, node):
-        # raise ValueError('we should never get here: %s' % node)
-        # give up
-        return
+_CHAIN_HANDLERS = {
+    ast.Attribute: GetAttrSubSymbols.visit_Attribute,
+    ast.Call: GetAttrSubSymbols.visit_Call,
+    ast.Name: GetAttrSubSymbols.visit_Name,
+    ast.Subscript: GetAttrSubSymbols.visit_Subscript,
+}
 
 
 def get_attrsub_symbol_chain(maybe_node: Union[str, ast.Attribute, ast.Subscript, ast.Call]) -> AttrSubSymbolChain:
-    if isinstance(maybe_node, (ast.Attribute, ast.Subscript, ast.Call)):
+    if isinstance(maybe_node, _CHAIN_NODE_TYPES):
         node = maybe_node
     else:
         node = cast('Union[ast.Attribute, ast.Subscript, ast.Call]',
                     cast(ast.Expr, ast.parse(maybe_node).body[0]).value)
-    if not isinstance(node, (ast.Attribute, ast.Subscript, ast.Call)):
+    if not isinstance(node, _CHAIN_NODE_TYPES):
         raise TypeError('invalid type for node %s' % node)
     return GetAttrSubSymbols()(node)
 
@@ -1,7 +1,7 @@
 # -*- coding: future_annotations -*-
 import ast
 import logging
-from typing import cast, TYPE_CHECKING
+from typing import TYPE_CHECKING
 
 from nbsafety.analysis.attr_symbols import get_attrsub_symbol_chain, AttrSubSymbolChain, CallPoint
 from nbsafety.analysis.mixins import SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitListsMixin
@@ -14,14 +14,17 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
 
+_ATTRSUB_TYPES = (ast.Attribute, ast.Subscript)
+
+
 # TODO: have the logger warnings additionally raise exceptions for tests
 class ComputeLiveSymbolRefs(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitListsMixin, ast.NodeVisitor):
-    def __init__(self, init_killed: Optional[Set[str]] = None):
+    def __init__(self, init_killed: Optional[Set[SymbolRef]] = None):
         self.live: Set[SymbolRef] = set()
         if init_killed is None:
             self.dead: Set[SymbolRef] = set()
         else:
-            self.dead = cast('Set[SymbolRef]', init_killed)
+            self.dead = init_killed
         # TODO: use the ast context instead of hacking our own (e.g. ast.Load(), ast.Store(), etc.)
         self.in_kill_context = False
         self.inside_attrsub = False
@@ -30,10 +33,10 @@ class ComputeLiveSymbolRefs(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitL
     def __call__(self, module_node: ast.Module):
         """
         This function should be called when we want to do a liveness check on a
-        cell's corresponding ast.Module. For each line/block of the cell we
-        first run the check of new assignments, then we obtain all the names.
-        In these names, we put the ones that are user defined and not in the
-        killed set into the return check_set for further checks.
+        cell's corresponding ast.Module. Each line/block of the cell is visited
+        exactly once: loaded names that are not yet in the killed set are added
+        to the live set as we encounter them, and assignment / def / loop targets
+        are added to the killed set after their right-hand sides are visited.
         """
         # TODO: this will break if we ref a variable in a loop before killing it in the
         #   same loop, since we will add everything on the LHS of an assignment to the killed
@@ -99,17 +102,17 @@ class ComputeLiveSymbolRefs(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitL
     def visit_Assign_target(
         self, target_node: Union[ast.Attribute, ast.Name, ast.Subscript, ast.Tuple, ast.List, ast.expr]
     ):
-        if isinstance(target_node, ast.Name):
+        if type(target_node) is ast.Name:
             self.dead.add(target_node.id)
-        elif isinstance(target_node, (ast.Attribute, ast.Subscript)):
+        elif type(target_node) is ast.Attribute or type(target_node) is ast.Subscript:
             self.dead.add(get_attrsub_symbol_chain(target_node))
-            if isinstance(target_node, ast.Subscript):
+            if type(target_node) is ast.Subscript:
                 with self.live_context():
                     self.visit(target_node.slice)
-        elif isinstance(target_node, (ast.Tuple, ast.List)):
+        elif type(target_node) is ast.Tuple or type(target_node) is ast.List:
             for elt in target_node.elts:
                 self.visit_Assign_target(elt)
-        elif isinstance(target_node, ast.Starred):
+        elif type(target_node) is ast.Starred:
             self.visit_Assign_target(target_node.value)
         else:
             logger.warning('unsupported type for node %s' % target_node)
@@ -154,7 +157,7 @@ class ComputeLiveSymbolRefs(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitL
             for kwarg in node.keywords:
                 self.visit(kwarg.value)
         self._add_attrsub_to_live_if_eligible(get_attrsub_symbol_chain(node))
-        if isinstance(node.func, (ast.Attribute, ast.Subscript)):
+        if isinstance(node.func, _ATTRSUB_TYPES):
             with self.attrsub_context():
                 self.visit(node.func)
         else:
@@ -208,7 +211,7 @@ class ComputeLiveSymbolRefs(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitL
 
 def compute_live_dead_symbol_refs(
         code: Union[ast.Module, List[ast.stmt], str],
-        init_killed: Optional[Set[str]] = None
+        init_killed: Optional[Set[SymbolRef]] = None
 ) -> Tuple[Set[SymbolRef], Set[SymbolRef]]:
     if init_killed is None:
         init_killed = set()
@@ -11,7 +11,7 @@ from nbsafety.analysis.attr_symbols import AttrSubSymbolChain
 from nbsafety.analysis.live_refs import compute_live_dead_symbol_refs
 
 if TYPE_CHECKING:
-    from typing import Set, Tuple
+    from typing import Iterable, List, Set, Tuple
     from nbsafety.types import SymbolRef
 
 logger = logging.getLogger(__name__)
@@ -19,7 +19,7 @@ logger.setLevel(logging.WARNING)
 
 
 def get_symbols_for_references(
-    symbol_refs: Set[SymbolRef],
+    symbol_refs: Iterable[SymbolRef],
     scope: Scope,
     only_add_successful_resolutions: bool = False,
 ) -> Tuple[Set[DataSymbol], Set[DataSymbol]]:
@@ -65,37 +65,37 @@ def compute_call_chain_live_symbols(live: Set[DataSymbol]) -> Set[DataSymbol]:
     return live
 
 
-class ContainsNamedExprVisitor(ast.NodeVisitor):
-    def __init__(self):
-        self.contains_named_expr = False
-
-    def __call__(self, node: ast.stmt) -> bool:
+class ContainsNamedExprVisitor:
+    # walks with an explicit stack rather than NodeVisitor recursion so that we can bail on the first hit
+    def __call__(self, node: ast.AST) -> bool:
         if sys.version_info.minor < 8:
             return False
-        self.visit(node)
-        return self.contains_named_expr
+        named_expr_type = ast.NamedExpr
+        iter_child_nodes = ast.iter_child_nodes
+        stack: List[ast.AST] = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if type(node) is named_expr_type:
+                return True
+            stack.extend(iter_child_nodes(node))
+        return False
 
-    def visit_NamedExpr(self, node):
-        self.contains_named_expr = True
 
-    def generic_visit(self, node: ast.AST):
-        if self.contains_named_expr:
-            return
-        super().generic_visit(node)
+_SIMPLE_LVAL_STMT_TYPES = (
+    ast.Assign,
+    ast.AnnAssign,
+    ast.AugAssign,
+    ast.ClassDef,
+    ast.FunctionDef,
+    ast.AsyncFunctionDef,
+    ast.For,
+    ast.Import,
+    ast.ImportFrom,
+    ast.With,
+)
 
 
 def stmt_contains_lval(node: ast.stmt):
     # TODO: expand to method calls, etc.
-    simple_contains_lval = isinstance(node, (
-        ast.Assign,
-        ast.AnnAssign,
-        ast.AugAssign,
-        ast.ClassDef,
-        ast.FunctionDef,
-        ast.AsyncFunctionDef,
-        ast.For,
-        ast.Import,
-        ast.ImportFrom,
-        ast.With,
-    ))
+    simple_contains_lval = isinstance(node, _SIMPLE_LVAL_STMT_TYPES)
     return simple_contains_lval or ContainsNamedExprVisitor()(node)
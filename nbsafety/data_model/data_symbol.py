@@ -12,7 +12,7 @@ from nbsafety.singletons import nbs
 
 if TYPE_CHECKING:
     from nbsafety.types import SupportedIndexType
-    from typing import Any, Dict, Optional, Set, Union
+    from typing import AbstractSet, Any, Dict, FrozenSet, Iterable, Optional, Set, Union
 
     # avoid circular imports
     from nbsafety.data_model.scope import Scope, NamespaceScope
@@ -20,6 +20,9 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
+# DataSymbol.update_deps never mutates the deps it is given, so callers with none can share this
+EMPTY_DEPS: FrozenSet[DataSymbol] = frozenset()
+
 
 class DataSymbolType(Enum):
     DEFAULT = 'default'
@@ -71,6 +74,7 @@ class DataSymbol:
             self.call_scope = self.containing_scope.make_child_scope(self.name)
 
         self._defined_cell_num: int = nbs().cell_counter()
+        nbs().symbols_defined_this_cell[id(self)] = self
 
         # The notebook cell number required by this symbol to not be stale
         self.required_cell_num: int = self.defined_cell_num
@@ -107,6 +111,21 @@ class DataSymbol:
     def temporary_disable_warnings(self):
         self._temp_disable_warnings = True
 
+    @staticmethod
+    def temporary_disable_warnings_for(symbols: Iterable[DataSymbol]) -> None:
+        for sym in symbols:
+            sym._temp_disable_warnings = True
+
+    def record_used_version(self, timestamp: int) -> None:
+        if timestamp not in self.version_by_used_timestamp:
+            nbs().symbols_by_used_timestamp[timestamp].append(self)
+        self.version_by_used_timestamp[timestamp] = self.defined_cell_num
+
+    def record_live_version(self, timestamp: int) -> None:
+        if timestamp not in self.version_by_liveness_timestamp:
+            nbs().symbols_by_liveness_timestamp[timestamp].append(self)
+        self.version_by_liveness_timestamp[timestamp] = self.defined_cell_num
+
     @property
     def defined_cell_num(self) -> int:
         # TODO: probably should be renamed
@@ -119,6 +138,7 @@ class DataSymbol:
     def defined_cell_num(self, new_defined_cell_num: int) -> None:
         self._temp_disable_warnings = False
         self._defined_cell_num = new_defined_cell_num
+        nbs().symbols_defined_this_cell[id(self)] = self
 
     @property
     def version(self) -> int:
@@ -216,6 +236,13 @@ class DataSymbol:
         # kill the alias but leave the namespace
         # namespace needs to stick around to properly handle the staleness propagation protocol
         self._handle_aliases(readd=False)
+        nbs().symbols_defined_this_cell.pop(id(self), None)
+        for timestamp_index, timestamps in [
+            (nbs().symbols_by_used_timestamp, self.version_by_used_timestamp),
+            (nbs().symbols_by_liveness_timestamp, self.version_by_liveness_timestamp),
+        ]:
+            for timestamp in timestamps:
+                timestamp_index[timestamp] = [sym for sym in timestamp_index[timestamp] if sym is not self]
 
     # def update_type(self, new_type):
     #     self.symbol_type = new_type
@@ -317,7 +344,7 @@ class DataSymbol:
         return True
 
     def update_deps(
-        self, new_deps: Set['DataSymbol'], overwrite=True, mutated=False, deleted=False, propagate=True
+        self, new_deps: AbstractSet[DataSymbol], overwrite=True, mutated=False, deleted=False, propagate=True
     ):
         # skip updates for imported symbols
         if self.is_import:
@@ -329,7 +356,9 @@ class DataSymbol:
         overwrite = overwrite and self not in new_deps
         overwrite = overwrite and not any(self in new_dep.parents for new_dep in new_deps)
         logger.warning("symbol %s new deps %s", self, new_deps)
-        new_deps.discard(self)
+        if self in new_deps:
+            # don't discard in place; callers may share one set of deps across several symbols
+            new_deps = new_deps - {self}
         if overwrite:
             for parent in self.parents - new_deps:
                 for parent_children in parent.children_by_cell_position.values():
@@ -1,9 +1,9 @@
 # -*- coding: future_annotations -*-
 import ast
-import inspect
 import itertools
 import logging
-from typing import TYPE_CHECKING
+import sys
+from typing import cast, TYPE_CHECKING
 import weakref
 
 from IPython import get_ipython
@@ -13,7 +13,7 @@ except ImportError:
     pandas = None
 
 from nbsafety.analysis import AttrSubSymbolChain, CallPoint
-from nbsafety.data_model.data_symbol import DataSymbol, DataSymbolType
+from nbsafety.data_model.data_symbol import DataSymbol, DataSymbolType, EMPTY_DEPS
 from nbsafety.singletons import nbs, nbs_check_init
 
 if TYPE_CHECKING:
@@ -25,20 +25,40 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 
+_NOT_FOUND = object()
+
+
 class Scope:
     GLOBAL_SCOPE_NAME = '<module>'
 
+    # bumped whenever any scope is renamed or reparented; memoized paths / ancestry from older epochs are stale
+    _structure_epoch = 0
+
+    # bumped whenever a cell finishes executing; memoized attrsub chain resolutions from older epochs are stale
+    _chain_resolution_epoch = 0
+
     def __init__(
         self,
         scope_name: str = GLOBAL_SCOPE_NAME,
         parent_scope: Optional[Scope] = None,
     ):
-        self.scope_name = str(scope_name)
-        self.parent_scope = parent_scope  # None iff this is the global scope
+        self._scope_name = sys.intern(str(scope_name))
+        self._parent_scope = parent_scope  # None iff this is the global scope
         self._data_symbol_by_name: Dict[SupportedIndexType, DataSymbol] = {}
+        self._cached_structure_epoch = -1
+        self._cached_full_path: Tuple[str, ...] = ()
+        self._cached_hash = 0
+        self._cached_non_namespace_parent_scope: Optional[Scope] = None
+        self._cached_ancestor_symbol_tables: Tuple[Dict[SupportedIndexType, DataSymbol], ...] = ()
+        self._cached_is_globally_accessible = False
+        self._cached_global_scope: Optional[Scope] = None
+        self._chain_cache_epoch = -1
+        self._chain_cache: Dict[AttrSubSymbolChain, Tuple[Optional[DataSymbol], Optional[DataSymbol], bool]] = {}
 
     def __hash__(self):
-        return hash(self.full_path)
+        if self._cached_structure_epoch != Scope._structure_epoch:
+            self._refresh_structural_cache()
+        return self._cached_hash
 
     def __str__(self):
         return str(self.full_path)
@@ -51,19 +71,39 @@ class Scope:
             raise ValueError('Only namespace scopes carry subscripts')
         return self._data_symbol_by_name
 
+    @property
+    def scope_name(self) -> str:
+        return self._scope_name
+
+    @scope_name.setter
+    def scope_name(self, new_scope_name: str) -> None:
+        self._scope_name = sys.intern(str(new_scope_name))
+        Scope._structure_epoch += 1
+
+    @property
+    def parent_scope(self) -> Optional[Scope]:
+        return self._parent_scope
+
+    @parent_scope.setter
+    def parent_scope(self, new_parent_scope: Optional[Scope]) -> None:
+        self._parent_scope = new_parent_scope
+        Scope._structure_epoch += 1
+
     @property
     def is_namespace_scope(self):
         return isinstance(self, NamespaceScope)
 
     @property
-    def non_namespace_parent_scope(self):
-        # a scope nested inside of a namespace scope does not have access
-        # to unqualified members of the namespace scope
-        if self.is_global:
-            return None
-        if self.parent_scope.is_namespace_scope:
-            return self.parent_scope.non_namespace_parent_scope
-        return self.parent_scope
+    def non_namespace_parent_scope(self) -> Optional[Scope]:
+        if self._cached_structure_epoch != Scope._structure_epoch:
+            self._refresh_structural_cache()
+        return self._cached_non_namespace_parent_scope
+
+    @property
+    def ancestor_symbol_tables(self) -> Tuple[Dict[SupportedIndexType, DataSymbol], ...]:
+        if self._cached_structure_epoch != Scope._structure_epoch:
+            self._refresh_structural_cache()
+        return self._cached_ancestor_symbol_tables
 
     def make_child_scope(self, scope_name, obj_id=None) -> Scope:
         if obj_id is None:
@@ -72,50 +112,95 @@ class Scope:
             return NamespaceScope(obj_id, scope_name, parent_scope=self)
 
     def put(self, name: SupportedIndexType, val: DataSymbol):
+        if type(name) is str:
+            # interned keys let dict probes short-circuit on identity
+            name = sys.intern(name)
         self._data_symbol_by_name[name] = val
         val.containing_scope = self
 
+    def _put_dotted(self, name: str, val: DataSymbol):
+        if type(name) is str:
+            # sys.intern rejects str subclasses, so only exact strs get interned
+            name = sys.intern(name)
+        self._data_symbol_by_name[name] = val
+        val.containing_scope = self
+
+    def _put_subscript(self, name: SupportedIndexType, val: DataSymbol):
+        # non-namespace scopes do not distinguish subscript symbols
+        self.put(name, val)
+
     def lookup_data_symbol_by_name_this_indentation(self, name, **_) -> Optional[DataSymbol]:
         return self._data_symbol_by_name.get(name, None)
 
+    def _lookup_dot(self, name: SupportedIndexType) -> Optional[DataSymbol]:
+        return self._data_symbol_by_name.get(name, None)
+
+    def _lookup_sub(self, name: SupportedIndexType) -> Optional[DataSymbol]:
+        # non-namespace scopes do not distinguish subscript symbols
+        return self._data_symbol_by_name.get(name, None)
+
     def all_data_symbols_this_indentation(self):
         return self._data_symbol_by_name.values()
 
     def lookup_data_symbol_by_name(self, name, **kwargs) -> Optional[DataSymbol]:
         ret = self.lookup_data_symbol_by_name_this_indentation(name, **kwargs)
-        if ret is None and self.non_namespace_parent_scope is not None:
-            ret = self.non_namespace_parent_scope.lookup_data_symbol_by_name(name, **kwargs)
-        return ret
+        if ret is not None:
+            return ret
+        # every accessible ancestor is a non-namespace scope, so we can hit their dicts directly
+        for data_symbol_by_name in self.ancestor_symbol_tables:
+            ret = data_symbol_by_name.get(name, None)
+            if ret is not None:
+                return ret
+        return None
 
     @staticmethod
-    def _get_name_to_obj_mapping(obj, dc) -> Dict[SupportedIndexType, Any]:
+    def _get_obj_for_name(obj, dc, name: SupportedIndexType) -> Any:
+        """
+        Look up `name` inside of `obj` (or inside the user namespace if `obj` is None),
+        returning `_NOT_FOUND` if it is not present.
+        """
         if obj is None:
-            return get_ipython().ns_table['user_global']
-        elif dc is not None and dc.is_subscript:
-            return obj
-        else:
-            try:
-                if (pandas is not None) and isinstance(obj, pandas.DataFrame):
-                    # FIXME: hack to get it working w/ pandas, which doesn't play nicely w/ inspect.getmembers
-                    name_to_obj = {}
-                    for col in obj.columns:
-                        try:
-                            name_to_obj[col] = getattr(obj, col)
-                        except:
-                            continue
-                else:
-                    name_to_obj = obj.__dict__
-            except:  # noqa
-                return dict(inspect.getmembers(obj))
-        return name_to_obj
+            return get_ipython().ns_table['user_global'].get(name, _NOT_FOUND)
+        try:
+            if dc is not None and dc.is_subscript:
+                if isinstance(obj, dict):
+                    return obj.get(name, _NOT_FOUND)
+                return obj[name]
+            elif (pandas is not None) and isinstance(obj, pandas.DataFrame):
+                # FIXME: hack to get it working w/ pandas; only columns are resolvable
+                if name not in obj.columns:
+                    return _NOT_FOUND
+                return getattr(obj, cast(str, name))
+            obj_dict = getattr(obj, '__dict__', None)
+            if obj_dict is None:
+                return getattr(obj, cast(str, name), _NOT_FOUND)
+            return obj_dict.get(name, _NOT_FOUND)
+        except Exception:
+            # e.g. out-of-range list index, or a property that raises
+            return _NOT_FOUND
+
+    @classmethod
+    def invalidate_chain_caches(cls) -> None:
+        cls._chain_resolution_epoch += 1
 
     def get_most_specific_data_symbol_for_attrsub_chain(self, chain: AttrSubSymbolChain):
         """
         Get most specific DataSymbol for the whole chain (stops at first point it cannot find nested, e.g. a CallPoint).
         """
+        if self._chain_cache_epoch != Scope._chain_resolution_epoch:
+            self._chain_cache.clear()
+            self._chain_cache_epoch = Scope._chain_resolution_epoch
+        ret = self._chain_cache.get(chain, None)
+        if ret is None:
+            ret = self._get_most_specific_data_symbol_for_attrsub_chain_inner(chain)
+            self._chain_cache[chain] = ret
+        return ret
+
+    def _get_most_specific_data_symbol_for_attrsub_chain_inner(self, chain: AttrSubSymbolChain):
         cur_scope = self
         dsym, next_dsym, success = None, None, False
         obj = None
+        get_namespace = nbs().namespaces.get
         for name in chain.symbols:
             if isinstance(name, CallPoint):
                 next_dsym = cur_scope.lookup_data_symbol_by_name(name.symbol)
@@ -128,11 +213,10 @@ class Scope:
                     dsym = None
                 break
             dsym, next_dsym = next_dsym, None
-            try:
-                obj = Scope._get_name_to_obj_mapping(obj, dsym)[name]
-            except (KeyError, IndexError, Exception):
+            obj = Scope._get_obj_for_name(obj, dsym, name)
+            if obj is _NOT_FOUND:
                 break
-            cur_scope = nbs().namespaces.get(id(obj), None)
+            cur_scope = get_namespace(id(obj), None)
             if cur_scope is None:
                 break
         else:
@@ -213,9 +297,10 @@ class Scope:
         implicit: bool = False,
     ) -> Tuple[DataSymbol, Optional[DataSymbol], Optional[int]]:
         old_id = None
-        old_dsym = self.lookup_data_symbol_by_name_this_indentation(
-            name, is_subscript=symbol_type == DataSymbolType.SUBSCRIPT, skip_cloned_lookup=True,
-        )
+        if symbol_type == DataSymbolType.SUBSCRIPT:
+            old_dsym = self._lookup_sub(name)
+        else:
+            old_dsym = self._lookup_dot(name)
         if implicit and symbol_type != DataSymbolType.ANONYMOUS:
             assert old_dsym is None, 'expected None, got %s' % old_dsym
         if old_dsym is not None and self.is_globally_accessible:
@@ -256,39 +341,70 @@ class Scope:
         dsym = DataSymbol(
             name, symbol_type, obj, self, stmt_node=stmt_node, parents=deps, refresh_cached_obj=False, implicit=implicit
         )
-        self.put(name, dsym)
+        if symbol_type == DataSymbolType.SUBSCRIPT:
+            self._put_subscript(name, dsym)
+        else:
+            self._put_dotted(cast(str, name), dsym)
         return dsym, old_dsym, old_id
 
     def delete_data_symbol_for_name(self, name: SupportedIndexType, is_subscript: bool = False):
         dsym = self._data_symbol_by_name.pop(name, None)
         if dsym is not None:
-            dsym.update_deps(set())
+            dsym.update_deps(EMPTY_DEPS)
 
     @property
     def is_global(self):
-        return self.parent_scope is None
+        return self._parent_scope is None
 
     @property
     def is_garbage(self):
         return False
 
     @property
-    def is_globally_accessible(self):
-        return self.is_global or (self.is_namespace_scope and self.parent_scope.is_globally_accessible)
+    def is_globally_accessible(self) -> bool:
+        if self._cached_structure_epoch != Scope._structure_epoch:
+            self._refresh_structural_cache()
+        return self._cached_is_globally_accessible
 
     @property
-    def global_scope(self):
-        if self.is_global:
-            return self
-        return self.parent_scope.global_scope
+    def global_scope(self) -> Scope:
+        if self._cached_structure_epoch != Scope._structure_epoch:
+            self._refresh_structural_cache()
+        return self._cached_global_scope
+
+    def _refresh_structural_cache(self) -> None:
+        path: Tuple[str, ...] = (self._scope_name,)
+        parent = self._parent_scope
+        if parent is None:
+            non_namespace_parent = None
+            self._cached_is_globally_accessible = True
+            self._cached_global_scope = self
+        else:
+            self._cached_is_globally_accessible = self.is_namespace_scope and parent.is_globally_accessible
+            self._cached_global_scope = parent.global_scope
+            path = parent.full_path + path
+            # a scope nested inside of a namespace scope does not have access
+            # to unqualified members of the namespace scope
+            if parent.is_namespace_scope:
+                non_namespace_parent = parent.non_namespace_parent_scope
+            else:
+                non_namespace_parent = parent
+        self._cached_non_namespace_parent_scope = non_namespace_parent
+        if non_namespace_parent is None:
+            self._cached_ancestor_symbol_tables = ()
+        else:
+            self._cached_ancestor_symbol_tables = (
+                non_namespace_parent._data_symbol_by_name,
+            ) + non_namespace_parent.ancestor_symbol_tables
+        self._cached_full_path = path
+        self._cached_hash = hash(path)
+        self._cached_structure_epoch = Scope._structure_epoch
 
     @property
     def full_path(self) -> Tuple[str, ...]:
-        path = (self.scope_name,)
-        if self.is_global:
-            return path
-        else:
-            return self.parent_scope.full_path + path
+        if self._cached_structure_epoch != Scope._structure_epoch:
+            self._refresh_structural_cache()
+        return self._cached_full_path
 
     @property
     def full_namespace_path(self) -> str:
@@ -337,27 +453,19 @@ class NamespaceScope(Scope):
             raise TypeError("tried to get length of non-container namespace %s: %s", self, obj)
         return len(obj)
 
-    def _iter_inner(self, obj):
-        for i in range(len(obj)):
-            yield self.lookup_data_symbol_by_name_this_indentation(i, is_subscript=True)
-
     def __iter__(self):
         obj = self._obj_ref()
         if not isinstance(obj, (list, tuple)):
             raise TypeError("tried to iterate through non-sequence namespace %s: %s", self, obj)
-        # do the validation before starting the generator part so that we raise immediately
-        return self._iter_inner(obj)
-
-    def _items_inner(self, obj):
-        for key in obj.keys():
-            yield key, self.lookup_data_symbol_by_name_this_indentation(key, is_subscript=True)
+        lookup = self._subscript_data_symbol_by_name.get
+        return iter([lookup(i) for i in range(len(obj))])
 
     def items(self):
         obj = self._obj_ref()
         if not isinstance(obj, dict):
             raise TypeError("tried to get iterate through items of non-dict namespace: %s", obj)
-        # do the validation before starting the generator part so that we raise immediately
-        return self._items_inner(obj)
+        lookup = self._subscript_data_symbol_by_name.get
+        return iter([(key, lookup(key)) for key in obj])
 
     @property
     def is_garbage(self):
@@ -416,6 +524,7 @@ class NamespaceScope(Scope):
         cloned.update_obj_ref(obj)
         cloned._data_symbol_by_name = {}
         cloned._subscript_data_symbol_by_name = {}
+        cloned._chain_cache = {}
         self.child_clones.append(cloned)
         return cloned
 
@@ -433,18 +542,26 @@ class NamespaceScope(Scope):
         else:
             return name
 
+    def _lookup_sub(self, name: SupportedIndexType) -> Optional[DataSymbol]:
+        return self._subscript_data_symbol_by_name.get(name, None)
+
+    def _lookup_both(self, name: SupportedIndexType) -> Optional[DataSymbol]:
+        ret = self._data_symbol_by_name.get(name, None)
+        if ret is None:
+            ret = self._subscript_data_symbol_by_name.get(name, None)
+        return ret
+
     def lookup_data_symbol_by_name_this_indentation(self, name, is_subscript=None, skip_cloned_lookup=False):
         # TODO: specify in arguments whether `name` refers to a subscript
         if is_subscript is None:
-            ret = self._data_symbol_by_name.get(name, None)
-            if ret is None:
-                ret = self._subscript_data_symbol_by_name.get(name, None)
+            ret = self._lookup_both(name)
         elif is_subscript:
-            ret = self._subscript_data_symbol_by_name.get(name, None)
+            ret = self._lookup_sub(name)
         else:
-            ret = self._data_symbol_by_name.get(name, None)
+            ret = self._lookup_dot(name)
         if not skip_cloned_lookup and ret is None and self.cloned_from is not None and not is_subscript and isinstance(name, str):
-            if name not in getattr(self._obj_ref(), '__dict__', {}):
+            obj_dict = getattr(self._obj_ref(), '__dict__', None)
+            if obj_dict is None or name not in obj_dict:
                 # only fall back to the class sym if it's not present in the corresponding obj for this scope
                 ret = self.cloned_from.lookup_data_symbol_by_name_this_indentation(name, is_subscript=is_subscript)
         return ret
@@ -453,15 +570,25 @@ class NamespaceScope(Scope):
         logger.info("delete %s from %s", name, self)
         if is_subscript:
             dsym = self._subscript_data_symbol_by_name.pop(name, None)
-            if dsym is None and name == -1 and isinstance(self._obj_ref(), list):
-                name = len(self._obj_ref())  # it will have already been deleted, so don't subtract 1
-                dsym = self._subscript_data_symbol_by_name.pop(name, None)
+            if dsym is None and name == -1:
+                obj = self._obj_ref()
+                if isinstance(obj, list):
+                    name = len(obj)  # it will have already been deleted, so don't subtract 1
+                    dsym = self._subscript_data_symbol_by_name.pop(name, None)
             if dsym is not None:
-                dsym.update_deps(set(), deleted=True)
+                dsym.update_deps(EMPTY_DEPS, deleted=True)
         else:
             super().delete_data_symbol_for_name(name)
 
     def all_data_symbols_this_indentation(self, exclude_class=False, is_subscript=None) -> Iterable[DataSymbol]:
+        if exclude_class or self.cloned_from is None:
+            # fast path: no class symbols to chain in
+            if is_subscript is None:
+                return itertools.chain(self._data_symbol_by_name.values(), self._subscript_data_symbol_by_name.values())
+            elif is_subscript:
+                return self._subscript_data_symbol_by_name.values()
+            else:
+                return self._data_symbol_by_name.values()
         if is_subscript is None:
             dsym_collections_to_chain: List[Iterable] = [
                 self._data_symbol_by_name.values(), self._subscript_data_symbol_by_name.values()
@@ -470,8 +597,7 @@ class NamespaceScope(Scope):
             dsym_collections_to_chain = [self._subscript_data_symbol_by_name.values()]
         else:
             dsym_collections_to_chain = [self._data_symbol_by_name.values()]
-        if self.cloned_from is not None and not exclude_class:
-            dsym_collections_to_chain.append(self.cloned_from.all_data_symbols_this_indentation())
+        dsym_collections_to_chain.append(self.cloned_from.all_data_symbols_this_indentation())
         return itertools.chain(*dsym_collections_to_chain)
 
     @property
@@ -488,11 +614,16 @@ class NamespaceScope(Scope):
 
     def put(self, name: SupportedIndexType, val: DataSymbol):
         if val.is_subscript:
-            self._subscript_data_symbol_by_name[name] = val
+            self._put_subscript(name, val)
         else:
             if not isinstance(name, str):
                 raise TypeError('%s should be a string' % name)
-            self._data_symbol_by_name[name] = val
+            self._put_dotted(name, val)
+
+    def _put_subscript(self, name: SupportedIndexType, val: DataSymbol):
+        if type(name) is str:
+            name = sys.intern(name)
+        self._subscript_data_symbol_by_name[name] = val
         val.containing_scope = self
 
     def refresh(self):
@@ -505,11 +636,10 @@ class NamespaceScope(Scope):
             ret = self.namespace_parent_scope.get_earliest_ancestor_containing(obj_id, is_subscript)
         if ret is not None:
             return ret
-        set_to_check = map(lambda dsym: dsym.obj_id, self.all_data_symbols_this_indentation(is_subscript=is_subscript))
-        if obj_id in set_to_check:
-            return self
-        else:
-            return None
+        for dsym in self.all_data_symbols_this_indentation(is_subscript=is_subscript):
+            if dsym.obj_id == obj_id:
+                return self
+        return None
 
     @property
     def namespace_parent_scope(self) -> Optional[NamespaceScope]:
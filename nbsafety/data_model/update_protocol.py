@@ -5,7 +5,7 @@ from typing import cast, TYPE_CHECKING
 from nbsafety.singletons import nbs
 
 if TYPE_CHECKING:
-    from typing import Set
+    from typing import AbstractSet, Set
 
     # avoid circular imports
     from nbsafety.data_model.data_symbol import DataSymbol
@@ -19,7 +19,7 @@ class UpdateProtocol:
     def __init__(
         self,
         updated_sym: DataSymbol,
-        new_deps: Set[DataSymbol],
+        new_deps: AbstractSet[DataSymbol],
         mutated: bool,
         deleted: bool,
     ):
@@ -3,9 +3,10 @@ import ast
 from collections import defaultdict
 from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import lru_cache, partial
 import inspect
+from itertools import islice
 import logging
-import re
 from typing import cast, TYPE_CHECKING, NamedTuple
 
 from IPython import get_ipython
@@ -32,8 +33,9 @@ from nbsafety.tracing.trace_manager import TraceManager
 # from nbsafety.utils.mixins import EnforceSingletonMixin
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, Iterable, List, Set, Optional, Tuple, Union
+    from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Set, Optional, Tuple, Union
     from types import FrameType
+    from nbsafety.types import SymbolRef
     CellId = Union[str, int]
 
 logger = logging.getLogger(__name__)
@@ -42,25 +44,108 @@ logger.setLevel(logging.WARNING)
 _MAX_WARNINGS = 10
 _SAFETY_LINE_MAGIC = 'safety'
 
-_NB_MAGIC_PATTERN = re.compile(r'(^%|^!|^cd |\?$)')
+_LINE_MAGIC_HANDLERS: Dict[str, Callable[[str], Any]] = {
+    **dict.fromkeys(('deps', 'show_deps', 'show_dependency', 'show_dependencies'), line_magics.show_deps),
+    **dict.fromkeys(('stale', 'show_stale'), line_magics.show_stale),
+    'trace_messages': line_magics.trace_messages,
+    **{cmd: partial(line_magics.set_highlights, cmd) for cmd in ('hls', 'nohls', 'highlight', 'highlights')},
+    **dict.fromkeys(('slice', 'make_slice', 'gather_slice'), line_magics.make_slice),
+    'remove_dependency': line_magics.remove_dep,
+    **dict.fromkeys(('add_dependency', 'add_dep'), line_magics.add_dep),
+    'turn_off_warnings_for': line_magics.turn_off_warnings_for,
+    'turn_on_warnings_for': line_magics.turn_on_warnings_for,
+}
+_LINE_MAGIC_NAMES = frozenset(name for name, member in vars(line_magics).items() if inspect.isfunction(member))
+
+# lines starting / ending with these are notebook magics / shell escapes / help requests, not python
+_NB_MAGIC_PREFIXES = ('%', '!', 'cd ')
+_NB_MAGIC_SUFFIX = '?'
+_NB_MAGIC_TOKENS = _NB_MAGIC_PREFIXES + (_NB_MAGIC_SUFFIX,)
+
+# number of distinct cell sources for which we memoize parsing / liveness results
+_CELL_CACHE_SIZE = 512
 
 
 def _safety_warning(node: DataSymbol):
     if not node.is_stale:
         raise ValueError('Expected node with stale ancestor; got %s' % node)
-    if node.defined_cell_num < 1:
+    if node.defined_cell_num < 1 or not logger.isEnabledFor(logging.WARNING):
         return
     fresher_symbols = node.fresher_ancestors
     if len(fresher_symbols) == 0:
         fresher_symbols = node.namespace_stale_symbols
     logger.warning(
-        f'`{node.readable_name}` defined in cell {node.defined_cell_num} may depend on '
-        f'old version(s) of [{", ".join(f"`{str(dep)}`" for dep in fresher_symbols)}] '
-        f'(latest update in cell {node.required_cell_num}).'
-        f'\n\n(Run cell again to override and execute anyway.)'
+        '`%s` defined in cell %d may depend on old version(s) of [%s] (latest update in cell %d).'
+        '\n\n(Run cell again to override and execute anyway.)',
+        node.readable_name,
+        node.defined_cell_num,
+        ', '.join(f'`{dep}`' for dep in fresher_symbols),
+        node.required_cell_num,
     )
 
 
+def _close_stale_links(
+    stale_cells: Set[CellId], stale_links: Dict[CellId, Set[CellId]]
+) -> Dict[CellId, Set[CellId]]:
+    """
+    Map each stale cell to the non-stale cells reachable from it via `stale_links`,
+    only passing through stale cells along the way. Stale cells in the same strongly
+    connected component share a closure, and Tarjan's algorithm finishes every
+    component after the components it can reach, so each closure is built once
+    from the closures of its successors.
+    """
+    closure: Dict[CellId, Set[CellId]] = {}
+    index: Dict[CellId, int] = {}
+    lowlink: Dict[CellId, int] = {}
+    scc_stack: List[CellId] = []
+    on_scc_stack: Set[CellId] = set()
+    for root in stale_cells:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        scc_stack.append(root)
+        on_scc_stack.add(root)
+        work = [(root, iter(stale_links[root]))]
+        while len(work) > 0:
+            cell_id, successors = work[-1]
+            for successor in successors:
+                if successor not in stale_cells:
+                    continue
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    scc_stack.append(successor)
+                    on_scc_stack.add(successor)
+                    work.append((successor, iter(stale_links[successor])))
+                    break
+                elif successor in on_scc_stack:
+                    lowlink[cell_id] = min(lowlink[cell_id], index[successor])
+            else:
+                work.pop()
+                if len(work) > 0:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[cell_id])
+                if lowlink[cell_id] != index[cell_id]:
+                    continue
+                component = []
+                while True:
+                    member = scc_stack.pop()
+                    on_scc_stack.discard(member)
+                    component.append(member)
+                    if member == cell_id:
+                        break
+                reachable: Set[CellId] = set()
+                for member in component:
+                    for refresher_cell_id in stale_links[member]:
+                        if refresher_cell_id not in stale_cells:
+                            reachable.add(refresher_cell_id)
+                        elif refresher_cell_id in closure:
+                            # successor component, already finished
+                            reachable |= closure[refresher_cell_id]
+                for member in component:
+                    closure[member] = reachable
+    return closure
+
+
 class NotebookSafetySettings(NamedTuple):
     store_history: bool
     test_context: bool
@@ -103,9 +188,18 @@ class NotebookSafety(singletons.NotebookSafety):
         self.global_scope: Scope = Scope()
         self.updated_symbols: Set[DataSymbol] = set()
         self.updated_scopes: Set[NamespaceScope] = set()
+        # (non-garbage) symbols whose version was set during the current cell, keyed by id
+        self.symbols_defined_this_cell: Dict[int, DataSymbol] = {}
         self.garbage_namespace_obj_ids: Set[int] = set()
+        # (non-garbage) symbols with a recorded version for each used / liveness timestamp
+        self.symbols_by_used_timestamp: Dict[int, List[DataSymbol]] = defaultdict(list)
+        self.symbols_by_liveness_timestamp: Dict[int, List[DataSymbol]] = defaultdict(list)
         self.ast_node_by_id: Dict[int, ast.AST] = {}
         self.statement_cache: 'Dict[int, Dict[int, ast.stmt]]' = defaultdict(dict)
+        # keyed on the node itself (not its id) so that entries are never confused with a recycled node;
+        # bounded by TraceStatement._memoize_for_stmt
+        self.stmt_contains_lval_by_node: Dict[ast.stmt, bool] = {}
+        self.symbol_edges_by_stmt_node: Dict[ast.stmt, List[Tuple[Union[str, ast.AST], ast.AST]]] = {}
         self.cell_content_by_counter: Dict[int, str] = {}
         self.statement_to_func_cell: Dict[int, DataSymbol] = {}
         self.stale_dependency_detected = False
@@ -119,10 +213,13 @@ class NotebookSafety(singletons.NotebookSafety):
             self._cell_magic = self._make_cell_magic(cell_magic_name)
         self._line_magic = self._make_line_magic()
         self._last_refused_code: Optional[str] = None
-        self._prev_cell_stale_symbols: Set[DataSymbol] = set()
+        self._prev_cell_stale_symbols: FrozenSet[DataSymbol] = frozenset()
+        # resolved symbols by cell content; only valid until the next call to `_invalidate_resolution_caches`
+        self._resolved_symbols_by_cell_content: Dict[str, Dict[str, Set[DataSymbol]]] = {}
         self._cell_counter = 1
         self._recorded_cell_name_to_cell_num = True
         self._cell_name_to_cell_num_mapping: Dict[str, int] = {}
+        self._cell_name_by_filename: Dict[str, str] = {}
         self._ast_transformer_raised: Optional[Exception] = None
         if use_comm:
             get_ipython().kernel.comm_manager.register_target(__package__, self._comm_target)
@@ -162,16 +259,31 @@ class NotebookSafety(singletons.NotebookSafety):
             sym.last_used_cell_num = sym.defined_cell_num = sym.required_cell_num = 0
             sym.version_by_used_timestamp.clear()
             sym.version_by_liveness_timestamp.clear()
+        self.symbols_by_used_timestamp.clear()
+        self.symbols_by_liveness_timestamp.clear()
         self._cell_counter = 1
+        self._invalidate_resolution_caches()
+
+    def _invalidate_resolution_caches(self) -> None:
+        self._resolved_symbols_by_cell_content.clear()
+        Scope.invalidate_chain_caches()
 
     def set_ast_transformer_raised(self, new_val: Optional[Exception] = None) -> Optional[Exception]:
         ret = self._ast_transformer_raised
         self._ast_transformer_raised = new_val
         return ret
 
+    def _get_cell_name(self, filename: str) -> str:
+        # memoized since this is called for every traced frame, and cells keep the same filename
+        cell_name = self._cell_name_by_filename.get(filename, None)
+        if cell_name is None:
+            cell_name = filename.split('-')[3]
+            self._cell_name_by_filename[filename] = cell_name
+        return cell_name
+
     def get_position(self, frame: FrameType):
         try:
-            cell_num = self._cell_name_to_cell_num_mapping[frame.f_code.co_filename.split('-')[3]]
+            cell_num = self._cell_name_to_cell_num_mapping[self._get_cell_name(frame.f_code.co_filename)]
             return cell_num, frame.f_lineno
         except KeyError as e:
             print(frame.f_code.co_filename)
@@ -181,7 +293,7 @@ class NotebookSafety(singletons.NotebookSafety):
         if self._recorded_cell_name_to_cell_num:
             return
         self._recorded_cell_name_to_cell_num = True
-        self._cell_name_to_cell_num_mapping[frame.f_code.co_filename.split('-')[3]] = self.cell_counter()
+        self._cell_name_to_cell_num_mapping[self._get_cell_name(frame.f_code.co_filename)] = self.cell_counter()
 
     def set_active_cell(self, cell_id, position_idx=-1):
         self._active_cell_id = cell_id
@@ -234,10 +346,17 @@ class NotebookSafety(singletons.NotebookSafety):
         stale_symbols_by_cell_id: Dict[CellId, Set[DataSymbol]] = {}
         killing_cell_ids_for_symbol: Dict[DataSymbol, Set[CellId]] = defaultdict(
             set)
-        for cell_id, cell_content in cells_by_id.items():
-            if (order_index_by_cell_id is not None and
-                    order_index_by_cell_id.get(cell_id, -1) <= self.active_cell_position_idx):
-                continue
+        if order_index_by_cell_id is None:
+            cells_to_check: Iterable[Tuple[CellId, str]] = cells_by_id.items()
+        else:
+            # only cells after the active one are considered; filter them up front
+            active_cell_position_idx = self.active_cell_position_idx
+            get_order_index = order_index_by_cell_id.get
+            cells_to_check = [
+                (cell_id, cell_content) for cell_id, cell_content in cells_by_id.items()
+                if get_order_index(cell_id, -1) > active_cell_position_idx
+            ]
+        for cell_id, cell_content in cells_to_check:
             try:
                 symbols = self._check_cell_and_resolve_symbols(cell_content)
                 stale_symbols, dead_symbols = symbols['stale'], symbols['dead']
@@ -253,6 +372,9 @@ class NotebookSafety(singletons.NotebookSafety):
                 continue
         stale_links: Dict[CellId, Set[CellId]] = defaultdict(set)
         refresher_links: Dict[CellId, List[CellId]] = defaultdict(list)
+        get_killing_cell_ids = killing_cell_ids_for_symbol.get
+        # stale cells with the same stale symbols have the same refreshers (naive computation aside)
+        refresher_cell_ids_by_stale_syms: Dict[FrozenSet[DataSymbol], Set[CellId]] = {}
         for stale_cell_id in stale_cells:
             stale_syms = stale_symbols_by_cell_id[stale_cell_id]
             if self.settings.naive_refresher_computation:
@@ -263,26 +385,18 @@ class NotebookSafety(singletons.NotebookSafety):
                     order_index_by_cell_id=order_index_by_cell_id
                 )
             else:
-                refresher_cell_ids = set.union(
-                    *(killing_cell_ids_for_symbol[stale_sym] for stale_sym in stale_syms))
+                stale_syms_key = frozenset(stale_syms)
+                refresher_cell_ids = refresher_cell_ids_by_stale_syms.get(stale_syms_key, None)
+                if refresher_cell_ids is None:
+                    refresher_cell_ids = set()
+                    for stale_sym in stale_syms:
+                        refresher_cell_ids.update(get_killing_cell_ids(stale_sym, ()))
+                    refresher_cell_ids_by_stale_syms[stale_syms_key] = refresher_cell_ids
             stale_links[stale_cell_id] = refresher_cell_ids
-        stale_link_changes = True
-        # transitive closer up until we hit non-stale refresher cells
-        while stale_link_changes:
-            stale_link_changes = False
-            for stale_cell_id in stale_cells:
-                new_stale_links = set(stale_links[stale_cell_id])
-                original_length = len(new_stale_links)
-                for refresher_cell_id in stale_links[stale_cell_id]:
-                    if refresher_cell_id not in stale_cells:
-                        continue
-                    new_stale_links |= stale_links[refresher_cell_id]
-                new_stale_links.discard(stale_cell_id)
-                stale_link_changes = stale_link_changes or original_length != len(new_stale_links)
-                stale_links[stale_cell_id] = new_stale_links
-        for stale_cell_id in stale_cells:
-            stale_links[stale_cell_id] -= stale_cells
-            for refresher_cell_id in stale_links[stale_cell_id]:
+        # transitive closure up until we hit non-stale refresher cells
+        for stale_cell_id, refresher_cell_ids in _close_stale_links(stale_cells, stale_links).items():
+            stale_links[stale_cell_id] = refresher_cell_ids
+            for refresher_cell_id in refresher_cell_ids:
                 refresher_links[refresher_cell_id].append(stale_cell_id)
         return {
             'stale_cells': list(stale_cells),
@@ -302,51 +416,81 @@ class NotebookSafety(singletons.NotebookSafety):
         order_index_by_cell_id: Optional[Dict[CellId, int]] = None
     ) -> Set[CellId]:
         refresher_cell_ids: Set[CellId] = set()
-        stale_cell_content = cells_by_id[stale_cell_id]
+        stale_cell_ast = self._get_cell_ast(cells_by_id[stale_cell_id])
         for cell_id, cell_content in cells_by_id.items():
             if cell_id == stale_cell_id:
                 continue
             if (order_index_by_cell_id is not None and
                     order_index_by_cell_id.get(cell_id, -1) >= order_index_by_cell_id.get(stale_cell_id, -1)):
                 continue
-            concated_content = f'{cell_content}\n\n{stale_cell_content}'
             try:
-                concated_stale_symbols = self._check_cell_and_resolve_symbols(concated_content)['stale']
+                live_refs, dead_refs = self._get_cell_live_dead_symbol_refs(cell_content)
             except SyntaxError:
                 continue
+            # equivalent to analyzing `cell_content` and `stale_cell_content` concatenated together
+            concated_live_refs, concated_dead_refs = compute_live_dead_symbol_refs(
+                stale_cell_ast, init_killed=set(dead_refs)
+            )
+            concated_live_refs |= live_refs
+            concated_stale_symbols = self._resolve_symbols(concated_live_refs, concated_dead_refs)['stale']
             if concated_stale_symbols < stale_symbols:
                 refresher_cell_ids.add(cell_id)
         return refresher_cell_ids
 
     @staticmethod
-    def _get_cell_ast(cell):
-        lines = []
-        for line in cell.strip().split('\n'):
-            # TODO: figure out more robust strategy for filtering / transforming lines for the ast parser
-            # we filter line magics, but for %time, we would ideally like to trace the statement being timed
-            # TODO: how to do this?
-            if _NB_MAGIC_PATTERN.search(line) is None:
-                lines.append(line)
+    @lru_cache(maxsize=_CELL_CACHE_SIZE)
+    def _get_cell_ast(cell: str) -> ast.Module:
+        # the returned ast is shared across calls, so callers must not mutate it
+        # TODO: figure out more robust strategy for filtering / transforming lines for the ast parser
+        # we filter line magics, but for %time, we would ideally like to trace the statement being timed
+        # TODO: how to do this?
+        cell = cell.strip()
+        if not any(token in cell for token in _NB_MAGIC_TOKENS):
+            # no line can be filtered, so skip splitting and rejoining the source
+            return ast.parse(cell)
+        lines = [
+            line for line in cell.split('\n')
+            if not (line.startswith(_NB_MAGIC_PREFIXES) or line.endswith(_NB_MAGIC_SUFFIX))
+        ]
         return ast.parse('\n'.join(lines))
 
+    @staticmethod
+    @lru_cache(maxsize=_CELL_CACHE_SIZE)
+    def _get_cell_live_dead_symbol_refs(cell: str) -> Tuple[FrozenSet[SymbolRef], FrozenSet[SymbolRef]]:
+        live_symbol_refs, dead_symbol_refs = compute_live_dead_symbol_refs(NotebookSafety._get_cell_ast(cell))
+        return frozenset(live_symbol_refs), frozenset(dead_symbol_refs)
+
     def _get_max_defined_cell_num_for_symbols(self, symbols: Set[DataSymbol]) -> int:
         max_defined_cell_num = -1
+        get_namespace = self.namespaces.get
         for dsym in symbols:
-            max_defined_cell_num = max(
-                max_defined_cell_num, dsym.defined_cell_num)
-            if dsym.obj_id in self.namespaces:
-                namespace_scope = self.namespaces[dsym.obj_id]
-                max_defined_cell_num = max(
-                    max_defined_cell_num, namespace_scope.max_defined_timestamp)
+            if dsym.defined_cell_num > max_defined_cell_num:
+                max_defined_cell_num = dsym.defined_cell_num
+            namespace_scope = get_namespace(dsym.obj_id, None)
+            if namespace_scope is not None and namespace_scope.max_defined_timestamp > max_defined_cell_num:
+                max_defined_cell_num = namespace_scope.max_defined_timestamp
         return max_defined_cell_num
 
     def _check_cell_and_resolve_symbols(
         self,
         cell: Union[ast.Module, str]
     ) -> Dict[str, Set[DataSymbol]]:
-        if isinstance(cell, str):
-            cell = self._get_cell_ast(cell)
-        live_symbol_refs, dead_symbol_refs = compute_live_dead_symbol_refs(cell)
+        if not isinstance(cell, str):
+            return self._resolve_symbols(*compute_live_dead_symbol_refs(cell))
+        # the returned dict (and its sets) may be shared with other callers, so it should not be mutated
+        symbols = self._resolved_symbols_by_cell_content.get(cell, None)
+        if symbols is None:
+            symbols = self._resolve_symbols(*self._get_cell_live_dead_symbol_refs(cell))
+            if len(self._resolved_symbols_by_cell_content) >= _CELL_CACHE_SIZE:
+                self._resolved_symbols_by_cell_content.clear()
+            self._resolved_symbols_by_cell_content[cell] = symbols
+        return symbols
+
+    def _resolve_symbols(
+        self,
+        live_symbol_refs: Iterable[SymbolRef],
+        dead_symbol_refs: Iterable[SymbolRef],
+    ) -> Dict[str, Set[DataSymbol]]:
         live_symbols, called_symbols = get_symbols_for_references(
             live_symbol_refs, self.global_scope)
         live_symbols = live_symbols.union(compute_call_chain_live_symbols(called_symbols))
@@ -354,7 +498,7 @@ class NotebookSafety(singletons.NotebookSafety):
         dead_symbols, _ = get_symbols_for_references(
             dead_symbol_refs, self.global_scope, only_add_successful_resolutions=True
         )
-        stale_symbols = set(dsym for dsym in live_symbols if dsym.is_stale)
+        stale_symbols = {dsym for dsym in live_symbols if dsym.is_stale}
         return {
             'live': live_symbols,
             'dead': dead_symbols,
@@ -371,50 +515,55 @@ class NotebookSafety(singletons.NotebookSafety):
         we temporarily mark any stale symbols as being not stale and return `False`.
         """
         try:
-            cell_ast = self._get_cell_ast(cell)
+            symbols = self._check_cell_and_resolve_symbols(cell)
         except SyntaxError:
             return False
-        symbols = self._check_cell_and_resolve_symbols(cell_ast)
         stale_symbols, live_symbols = symbols['stale'], symbols['live']
         if self._last_refused_code is None or cell != self._last_refused_code:
-            self._prev_cell_stale_symbols = stale_symbols
+            self._prev_cell_stale_symbols = frozenset(stale_symbols)
             if len(stale_symbols) > 0:
-                warning_counter = 0
-                for sym in self._prev_cell_stale_symbols:
-                    if warning_counter >= _MAX_WARNINGS:
-                        logger.warning(f'{len(self._prev_cell_stale_symbols) - warning_counter}'
-                                       ' more nodes with stale dependencies skipped...')
-                        break
+                for sym in islice(stale_symbols, _MAX_WARNINGS):
                     _safety_warning(sym)
-                    warning_counter += 1
+                if len(stale_symbols) > _MAX_WARNINGS:
+                    logger.warning(
+                        '%d more nodes with stale dependencies skipped...', len(stale_symbols) - _MAX_WARNINGS
+                    )
                 self.stale_dependency_detected = True
                 self._last_refused_code = cell
                 return True
         else:
             # Instead of breaking the dependency chain, simply refresh the nodes
             # with stale deps to their required cell numbers
-            for sym in self._prev_cell_stale_symbols:
-                sym.temporary_disable_warnings()
-            self._prev_cell_stale_symbols.clear()
+            DataSymbol.temporary_disable_warnings_for(self._prev_cell_stale_symbols)
+            self._prev_cell_stale_symbols = frozenset()
+            self._invalidate_resolution_caches()
 
         # For each of the live symbols, record their `defined_cell_num`
         # at the time of liveness, for use with the dynamic slicer.
+        cell_counter = self.cell_counter()
         for sym in live_symbols:
-            sym.version_by_liveness_timestamp[self.cell_counter()] = sym.defined_cell_num
+            sym.record_live_version(cell_counter)
 
         self._last_refused_code = None
         return False
 
     def _resync_symbols(self, symbols: Iterable[DataSymbol]):
+        user_global_ns = get_ipython().user_global_ns
         for dsym in symbols:
             if not dsym.containing_scope.is_global:
                 continue
-            obj = get_ipython().user_global_ns.get(dsym.name, None)
+            obj = user_global_ns.get(dsym.name, None)
             if obj is None:
                 continue
             if dsym.obj_id == id(obj):
                 continue
-            for alias in self.aliases[dsym.cached_obj_id] | self.aliases[dsym.obj_id]:
+            old_aliases = self.aliases.get(dsym.cached_obj_id, None)
+            cur_aliases = self.aliases.get(dsym.obj_id, None)
+            # copy, since upserts below can add to the alias sets
+            aliases_to_check = set(old_aliases or ())
+            if cur_aliases is not None and cur_aliases is not old_aliases:
+                aliases_to_check.update(cur_aliases)
+            for alias in aliases_to_check:
                 if not alias.containing_scope.is_namespace_scope:
                     continue
                 containing_scope = cast(NamespaceScope, alias.containing_scope)
@@ -431,8 +580,10 @@ class NotebookSafety(singletons.NotebookSafety):
                         is_subscript=True,
                         propagate=False
                     )
-            self.aliases[dsym.cached_obj_id].discard(dsym)
-            self.aliases[dsym.obj_id].discard(dsym)
+            if old_aliases is not None:
+                old_aliases.discard(dsym)
+            if cur_aliases is not None:
+                cur_aliases.discard(dsym)
             self.aliases[id(obj)].add(dsym)
             namespace = self.namespaces.get(dsym.obj_id, None)
             if namespace is not None:
@@ -458,60 +609,40 @@ class NotebookSafety(singletons.NotebookSafety):
             raise ValueError(f'Cell {cell_num} has not been run yet.')
 
         dependencies: Set[int] = set()
-        cell_num_to_dynamic_deps: Dict[int, Set[int]] = defaultdict(set)
-        cell_num_to_static_deps: Dict[int, Set[int]] = defaultdict(set)
-
-        for sym in self.all_data_symbols():
-            for used_timestamp, version in sym.version_by_used_timestamp.items():
-                cell_num_to_dynamic_deps[used_timestamp].add(version)
-            for live_timestamp, version in sym.version_by_liveness_timestamp.items():
-                cell_num_to_static_deps[live_timestamp].add(version)
-
-        self._get_cell_dependencies(
-            cell_num, dependencies, cell_num_to_dynamic_deps, cell_num_to_static_deps)
+        self._get_cell_dependencies(cell_num, dependencies)
         return {num: self.cell_content_by_counter[num] for num in dependencies}
 
-    def _get_cell_dependencies(
-        self,
-        cell_num: int,
-        dependencies: Set[int],
-        cell_num_to_dynamic_deps: Dict[int, Set[int]],
-        cell_num_to_static_deps: Dict[int, Set[int]],
-    ) -> None:
+    def _get_cell_dependencies(self, cell_num: int, dependencies: Set[int]) -> None:
         """
-        For a given cell, this function recursively populates a set of
-        cell numbers that the given cell depends on, based on the live symbols.
+        For a given cell, this function populates a set of cell numbers
+        that the given cell (transitively) depends on, based on the live symbols.
+        Only the timestamps of cells actually reached are looked up.
 
         Args:
             - dependencies (set<int>): set of cell numbers so far that exist
             - cell_num (int): current cell to get dependencies for
-            - cell_num_to_dynamic_deps (dict<int, set<int>>): mapping from cell 
-            num to version of cells where its symbols were used
-            - cell_num_to_static_deps (dict<int, set<int>>): mapping from cell 
-            num to version of cells where its symbols were defined
 
         Returns:
             None
         """
-        # Base case: cell already in dependencies
-        if cell_num in dependencies or cell_num <= 0:
-            return
-
-        # Add current cell to dependencies
-        dependencies.add(cell_num)
-
-        # Retrieve cell numbers for the dependent symbols
-        # Add dynamic and static dependencies
-        dep_cell_nums = cell_num_to_dynamic_deps[cell_num] | cell_num_to_static_deps[cell_num]
-        logger.info('dynamic cell deps for %d: %s', cell_num,
-                    cell_num_to_dynamic_deps[cell_num])
-        logger.info('static cell deps for %d: %s', cell_num,
-                    cell_num_to_static_deps[cell_num])
+        get_used_syms = self.symbols_by_used_timestamp.get
+        get_live_syms = self.symbols_by_liveness_timestamp.get
+        empty: List[DataSymbol] = []
+        stack = [cell_num]
+        while len(stack) > 0:
+            cell_num = stack.pop()
+            # skip cells already in dependencies
+            if cell_num in dependencies or cell_num <= 0:
+                continue
+            dependencies.add(cell_num)
 
-        # For each dependent cell, recursively get their dependencies
-        for num in dep_cell_nums - dependencies:
-            self._get_cell_dependencies(
-                num, dependencies, cell_num_to_dynamic_deps, cell_num_to_static_deps)
+            # Retrieve cell numbers for the dependent symbols
+            # Add dynamic and static dependencies
+            dynamic_deps = {sym.version_by_used_timestamp[cell_num] for sym in get_used_syms(cell_num, empty)}
+            static_deps = {sym.version_by_liveness_timestamp[cell_num] for sym in get_live_syms(cell_num, empty)}
+            logger.info('dynamic cell deps for %d: %s', cell_num, dynamic_deps)
+            logger.info('static cell deps for %d: %s', cell_num, static_deps)
+            stack.extend((dynamic_deps | static_deps) - dependencies)
 
     def safe_execute(self, cell: str, run_cell_func):
         ret = None
@@ -536,11 +667,13 @@ class NotebookSafety(singletons.NotebookSafety):
                 # Stage 2.1: resync any defined symbols that could have gotten out-of-sync
                 #  due to tracing being disabled
 
+                cell_counter = self.cell_counter()
                 self._resync_symbols([
-                    # TODO: avoid bad performance by only iterating over symbols updated in this cell
-                    sym for sym in self.all_data_symbols() if sym.defined_cell_num == self.cell_counter()
+                    sym for sym in self.symbols_defined_this_cell.values() if sym.defined_cell_num == cell_counter
                 ])
             finally:
+                # symbols, namespaces, and user objects may have changed, so cached resolutions are no longer valid
+                self._invalidate_resolution_caches()
                 if not self.settings.store_history:
                     self._cell_counter += 1
                 return ret
@@ -563,6 +696,7 @@ class NotebookSafety(singletons.NotebookSafety):
     def _tracing_context(self):
         self.updated_symbols.clear()
         self.updated_scopes.clear()
+        self.symbols_defined_this_cell.clear()
         self._recorded_cell_name_to_cell_num = False
 
         try:
@@ -581,33 +715,16 @@ class NotebookSafety(singletons.NotebookSafety):
         self._gc()
 
     def _make_line_magic(self):
-        line_magic_names = [f[0] for f in inspect.getmembers(line_magics) if inspect.isfunction(f[1])]
-
         def _safety(line_: str):
             # this is to avoid capturing `self` and creating an extra reference to the singleton
             try:
                 cmd, line = line_.split(' ', 1)
             except ValueError:
                 cmd, line = line_, ''
-            if cmd in ('deps', 'show_deps', 'show_dependency', 'show_dependencies'):
-                return line_magics.show_deps(line)
-            elif cmd in ('stale', 'show_stale'):
-                return line_magics.show_stale(line)
-            elif cmd == 'trace_messages':
-                return line_magics.trace_messages(line)
-            elif cmd in ('hls', 'nohls', 'highlight', 'highlights'):
-                return line_magics.set_highlights(cmd, line)
-            elif cmd in ('slice', 'make_slice', 'gather_slice'):
-                return line_magics.make_slice(line)
-            elif cmd == 'remove_dependency':
-                return line_magics.remove_dep(line)
-            elif cmd in ('add_dependency', 'add_dep'):
-                return line_magics.add_dep(line)
-            elif cmd == 'turn_off_warnings_for':
-                return line_magics.turn_off_warnings_for(line)
-            elif cmd == 'turn_on_warnings_for':
-                return line_magics.turn_on_warnings_for(line)
-            elif cmd in line_magic_names:
+            handler = _LINE_MAGIC_HANDLERS.get(cmd, None)
+            if handler is not None:
+                return handler(line)
+            elif cmd in _LINE_MAGIC_NAMES:
                 print('We have a magic for %s, but have not yet registered it' % cmd)
             else:
                 print(line_magics.USAGE)
@@ -23,7 +23,9 @@ class ResolveRvalSymbols(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitList
 
     def __call__(self, node: ast.AST) -> Set[DataSymbol]:
         self.visit(node)
-        return {sym for sym in self.symbols if sym is not None}
+        symbols = set(self.symbols)
+        symbols.discard(None)
+        return symbols
 
     def _push_symbols(self):
         return self.push_attributes(symbols=[])
@@ -173,7 +175,7 @@ class ResolveRvalSymbols(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitList
                 with self._push_symbols():
                     self.visit(gen.iter)
                     self.visit(gen.ifs)
-                    to_append |= set(self.symbols)
+                    to_append.update(self.symbols)
                 with self._push_symbols():
                     self.visit(gen.target)
                     discard_set = set(self.symbols)
@@ -225,13 +227,16 @@ class ResolveRvalSymbols(SaveOffAttributesMixin, SkipUnboundArgsMixin, VisitList
 
 def update_usage_info(symbols: Union[Optional[DataSymbol], Set[Optional[DataSymbol]]]):
     cell_counter = nbs().cell_counter()
-    for sym in (symbols if symbols is not None and isinstance(symbols, set) else [symbols]):
+    # checked once per call rather than once per symbol, since this runs for every mutation and rval resolution
+    log_usage = logger.isEnabledFor(logging.INFO)
+    for sym in (symbols if isinstance(symbols, set) else (symbols,)):
         if sym is None:
             continue
         sym.last_used_cell_num = cell_counter
         if sym.defined_cell_num < cell_counter:
-            logger.info('sym `%s` used in cell %d last updated in cell %d', sym, cell_counter, sym.defined_cell_num)
-            sym.version_by_used_timestamp[cell_counter] = sym.defined_cell_num
+            if log_usage:
+                logger.info('sym `%s` used in cell %d last updated in cell %d', sym, cell_counter, sym.defined_cell_num)
+            sym.record_used_version(cell_counter)
 
 
 def resolve_rval_symbols(node: Union[str, ast.AST], should_update_usage_info: bool = True) -> Set[DataSymbol]:
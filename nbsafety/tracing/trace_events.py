@@ -7,7 +7,7 @@ from nbsafety.utils import fast
 EMIT_EVENT = '_X5ix_NBSAFETY_EVT_EMIT'
 
 
-class TraceEvent(Enum):
+class TraceEvent(str, Enum):
     before_stmt = 'before_stmt'
     after_stmt = 'after_stmt'
 
@@ -48,3 +48,7 @@ class TraceEvent(Enum):
 
     def to_ast(self):
         return fast.Constant(self.value)
+
+
+# instrumented code emits events by their string values; map back to members with a single dict lookup
+TRACE_EVENT_BY_VALUE = {evt.value: evt for evt in TraceEvent}
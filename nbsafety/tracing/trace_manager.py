@@ -16,7 +16,7 @@ from nbsafety.run_mode import SafetyRunMode
 from nbsafety.singletons import nbs
 from nbsafety.tracing.mutation_event import MutationEvent
 from nbsafety.tracing.symbol_resolver import resolve_rval_symbols
-from nbsafety.tracing.trace_events import TraceEvent, EMIT_EVENT
+from nbsafety.tracing.trace_events import TraceEvent, EMIT_EVENT, TRACE_EVENT_BY_VALUE
 from nbsafety.tracing.trace_stack import TraceStack
 from nbsafety.tracing.trace_stmt import TraceStatement
 from nbsafety.tracing.utils import match_container_obj_or_namespace_with_literal_nodes
@@ -79,7 +79,7 @@ class BaseTraceManager(singletons.TraceManager):
         self.tracing_reset_pending = False
 
     def _emit_event(self, evt: Union[TraceEvent, str], node_id: int, **kwargs: Any):
-        event = TraceEvent(evt) if isinstance(evt, str) else evt
+        event = TRACE_EVENT_BY_VALUE[evt]
         frame = kwargs.get('_frame', sys._getframe().f_back)
         kwargs['_frame'] = frame
         for handler in self._event_handlers[event]:
@@ -478,7 +478,7 @@ class TraceManager(BaseTraceManager):
             sym_for_obj = self.active_scope.lookup_data_symbol_by_name_this_indentation(obj_name)
 
         if sym_for_obj is not None and sym_for_obj.defined_cell_num < nbs().cell_counter():
-            sym_for_obj.version_by_used_timestamp[nbs().cell_counter()] = sym_for_obj.defined_cell_num
+            sym_for_obj.record_used_version(nbs().cell_counter())
         
         is_subscript = (event == TraceEvent.subscript)
         obj_id = id(obj)
@@ -1,11 +1,11 @@
 # -*- coding: future_annotations -*-
 import ast
 import logging
-from typing import TYPE_CHECKING
+from typing import cast, TYPE_CHECKING
 
 from nbsafety.analysis.symbol_edges import get_symbol_edges
 from nbsafety.analysis.utils import stmt_contains_lval
-from nbsafety.data_model.data_symbol import DataSymbol
+from nbsafety.data_model.data_symbol import DataSymbol, EMPTY_DEPS
 from nbsafety.data_model.scope import NamespaceScope
 from nbsafety.singletons import nbs, tracer
 from nbsafety.tracing.mutation_event import MutationEvent
@@ -14,16 +14,29 @@ from nbsafety.tracing.utils import match_container_obj_or_namespace_with_literal
 
 if TYPE_CHECKING:
     from types import FrameType
-    from typing import List, Optional, Set, Tuple, Union
+    from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
+# number of distinct statements for which we memoize each ast-derived analysis result
+_STMT_CACHE_SIZE = 4096
+
 
 class TraceStatement:
+    __slots__ = (
+        'frame',
+        'stmt_node',
+        'stmt_id',
+        'class_scope',
+        'lambda_call_point_deps_done_once',
+        'node_id_for_last_call',
+    )
+
     def __init__(self, frame: FrameType, stmt_node: ast.stmt):
         self.frame = frame
         self.stmt_node = stmt_node
+        self.stmt_id = id(stmt_node)
         self.class_scope: Optional[NamespaceScope] = None
         self.lambda_call_point_deps_done_once = False
         self.node_id_for_last_call: Optional[int] = None
@@ -36,27 +49,36 @@ class TraceStatement:
     def finished(self):
         return self.stmt_id in tracer().seen_stmts
 
-    @property
-    def stmt_id(self):
-        return id(self.stmt_node)
+    def _memoize_for_stmt(self, cache: Dict[ast.stmt, Any], compute: Callable[[ast.stmt], Any]) -> Any:
+        # statements in functions get re-traced in every cell that calls them, so memoize the ast walks;
+        # like the cell caches, start over once full rather than grow with every statement ever traced
+        result = cache.get(self.stmt_node, None)
+        if result is None:
+            result = compute(self.stmt_node)
+            if len(cache) >= _STMT_CACHE_SIZE:
+                cache.clear()
+            cache[self.stmt_node] = result
+        return result
 
-    def _contains_lval(self):
-        return stmt_contains_lval(self.stmt_node)
+    def _contains_lval(self) -> bool:
+        return self._memoize_for_stmt(nbs().stmt_contains_lval_by_node, stmt_contains_lval)
 
     def get_post_call_scope(self):
         old_scope = tracer().cur_frame_original_scope
-        if isinstance(self.stmt_node, ast.ClassDef):
+        stmt_node = self.stmt_node
+        # exact type checks suffice here since ast node classes are never subclassed
+        if type(stmt_node) is ast.ClassDef:
             # classes need a new scope before the ClassDef has finished executing,
             # so we make it immediately
-            return old_scope.make_child_scope(self.stmt_node.name, obj_id=-1)
+            return old_scope.make_child_scope(stmt_node.name, obj_id=-1)
 
-        if not isinstance(self.stmt_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        if type(stmt_node) is not ast.FunctionDef and type(stmt_node) is not ast.AsyncFunctionDef:
             # TODO: probably the right thing is to check is whether a lambda appears somewhere inside the ast node
             # if not isinstance(self.ast_node, ast.Lambda):
             #     raise TypeError('unexpected type for ast node %s' % self.ast_node)
             return old_scope
-        func_name = self.stmt_node.name
-        func_cell = nbs().statement_to_func_cell.get(id(self.stmt_node), None)
+        func_name = stmt_node.name
+        func_cell = nbs().statement_to_func_cell.get(self.stmt_id, None)
         if func_cell is None:
             # TODO: brittle; assumes any user-defined and traceable function will always be present; is this safe?
             return old_scope
@@ -87,7 +109,8 @@ class TraceStatement:
         upserted = scope.upsert_data_symbol_for_name(
             name, obj, deps, self.stmt_node, is_subscript=is_subscript,
         )
-        logger.info("sym %s upserted to scope %s has parents %s", upserted, scope, upserted.parents)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("sym %s upserted to scope %s has parents %s", upserted, scope, upserted.parents)
         if maybe_fixup_literal_namespace:
             namespace_for_upsert = nbs().namespaces.get(id(obj), None)
             if namespace_for_upsert is not None and namespace_for_upsert.scope_name == NamespaceScope.ANONYMOUS:
@@ -95,9 +118,12 @@ class TraceStatement:
                 namespace_for_upsert.parent_scope = scope
 
     def _handle_assign_target_tuple_unpack_from_deps(self, target: Union[ast.List, ast.Tuple], deps: Set[DataSymbol]):
-        for inner_target in target.elts:
+        # push in reverse so that (nested) targets are still handled left to right
+        stack: List[ast.AST] = list(reversed(target.elts))
+        while len(stack) > 0:
+            inner_target = stack.pop()
             if isinstance(inner_target, (ast.List, ast.Tuple)):
-                self._handle_assign_target_tuple_unpack_from_deps(inner_target, deps)
+                stack.extend(reversed(inner_target.elts))
             else:
                 self._handle_assign_target_for_deps(inner_target, deps)
 
@@ -109,12 +135,14 @@ class TraceStatement:
             # use suppressed log level to avoid noise to user
             logger.info("Exception: %s", e)
             return
-        ns = nbs().namespaces.get(id(obj), None)
-        if ns is None:
-            ns = NamespaceScope(obj, str(name), scope)
-        for i, inner_dep in enumerate(inner_deps):
-            deps = set() if inner_dep is None else {inner_dep}
-            ns.upsert_data_symbol_for_name(i, inner_dep.get_obj(), deps, self.stmt_node, is_subscript=True)
+        if len(inner_deps) > 0:
+            # only materialize a namespace for the starred target if it actually captured something
+            ns = nbs().namespaces.get(id(obj), None)
+            if ns is None:
+                ns = NamespaceScope(obj, str(name), scope)
+            for i, inner_dep in enumerate(inner_deps):
+                deps = set() if inner_dep is None else {inner_dep}
+                ns.upsert_data_symbol_for_name(i, inner_dep.get_obj(), deps, self.stmt_node, is_subscript=True)
         scope.upsert_data_symbol_for_name(
             name,
             obj,
@@ -126,11 +154,20 @@ class TraceStatement:
     def _handle_assign_target_tuple_unpack_from_namespace(
         self, target: Union[ast.List, ast.Tuple], rhs_namespace: NamespaceScope
     ):
-        saved_starred_node: Optional[ast.Starred] = None
         saved_starred_deps = []
-        for (i, inner_dep), (_, inner_target) in match_container_obj_or_namespace_with_literal_nodes(rhs_namespace, target):
+        get_namespace = nbs().namespaces.get
+        elts = target.elts
+        starred_target = next((elt for elt in elts if isinstance(elt, ast.Starred)), None)
+        if starred_target is not None:
+            deps_and_targets: Iterable[Tuple[Optional[DataSymbol], ast.AST]] = (
+                (inner_dep, inner_target) for (_, inner_dep), (_, inner_target)
+                in match_container_obj_or_namespace_with_literal_nodes(rhs_namespace, target)
+            )
+        else:
+            # fast path: without a starred target, rhs elements and targets line up one-to-one
+            deps_and_targets = zip(rhs_namespace, elts)
+        for inner_dep, inner_target in deps_and_targets:
             if isinstance(inner_target, ast.Starred):
-                saved_starred_node = inner_target
                 saved_starred_deps.append(inner_dep)
                 continue
             if inner_dep is None:
@@ -138,7 +175,7 @@ class TraceStatement:
             else:
                 inner_deps = {inner_dep}
             if isinstance(inner_target, (ast.List, ast.Tuple)):
-                inner_namespace = nbs().namespaces.get(inner_dep.obj_id, None)
+                inner_namespace = get_namespace(inner_dep.obj_id, None)
                 if inner_namespace is None:
                     self._handle_assign_target_tuple_unpack_from_deps(inner_target, inner_deps)
                 else:
@@ -149,63 +186,97 @@ class TraceStatement:
                     inner_deps,
                     maybe_fixup_literal_namespace=True,
                 )
-        if saved_starred_node is not None:
-            self._handle_starred_assign_target(saved_starred_node, saved_starred_deps)
+        if starred_target is not None:
+            # the matcher never yields a starred target that captures no rhs elements,
+            # but it still needs a symbol, so handle it even if no deps were saved
+            self._handle_starred_assign_target(cast(ast.Starred, starred_target), saved_starred_deps)
 
-    def _handle_assign_target(self, target: ast.AST, value: ast.AST):
+    def _handle_assign_target(
+        self, target: ast.AST, rval_deps: Set[DataSymbol], rhs_namespace: Optional[NamespaceScope]
+    ):
         if isinstance(target, (ast.List, ast.Tuple)):
-            rhs_namespace = nbs().namespaces.get(tracer().saved_assign_rhs_obj_id, None)
             if rhs_namespace is None:
-                self._handle_assign_target_tuple_unpack_from_deps(target, resolve_rval_symbols(value))
+                self._handle_assign_target_tuple_unpack_from_deps(target, rval_deps)
             else:
                 self._handle_assign_target_tuple_unpack_from_namespace(target, rhs_namespace)
         else:
-            self._handle_assign_target_for_deps(
-                target, resolve_rval_symbols(value), maybe_fixup_literal_namespace=True
-            )
+            self._handle_assign_target_for_deps(target, rval_deps, maybe_fixup_literal_namespace=True)
 
     def _handle_assign(self, node: ast.Assign):
+        # the rhs is evaluated once regardless of the number of targets, so resolve it once too
+        rhs_namespace = nbs().namespaces.get(tracer().saved_assign_rhs_obj_id, None)
+        rval_deps: Optional[Set[DataSymbol]] = None
         for target in node.targets:
-            self._handle_assign_target(target, node.value)
+            if rval_deps is None and (rhs_namespace is None or not isinstance(target, (ast.List, ast.Tuple))):
+                rval_deps = resolve_rval_symbols(node.value)
+            # upserts may add to / discard from the deps they are given, so each target gets its own copy
+            self._handle_assign_target(target, set() if rval_deps is None else set(rval_deps), rhs_namespace)
 
     def _handle_delete(self):
         assert isinstance(self.stmt_node, ast.Delete)
+        resolve_store_or_del_data_for_target = tracer().resolve_store_or_del_data_for_target
+        # plain names always live in the current frame's scope and have no saved del data
+        name_scope = tracer().cur_frame_original_scope
+        del_ctx = ast.Del()
         for target in self.stmt_node.targets:
             try:
-                scope, name, _, is_subscript = tracer().resolve_store_or_del_data_for_target(target, self.frame, ctx=ast.Del())
+                if type(target) is ast.Name:
+                    name_scope.delete_data_symbol_for_name(target.id)
+                    continue
+                scope, name, _, is_subscript = resolve_store_or_del_data_for_target(target, self.frame, ctx=del_ctx)
                 scope.delete_data_symbol_for_name(name, is_subscript=is_subscript)
             except KeyError as e:
                 # this will happen if, e.g., a __delitem__ triggered a call
                 # logger.info("got key error while trying to handle %s: %s", ast.dump(self.stmt_node), e)
                 logger.info("got key error: %s", e)
 
+    # statement types with dedicated lval handling, keyed by exact type;
+    # everything else goes through _make_lval_data_symbols_old
+    _LVAL_HANDLERS_BY_STMT_TYPE: Dict[Type[ast.stmt], Callable[[TraceStatement, Any], None]] = {
+        ast.Assign: _handle_assign,
+    }
+
     def _make_lval_data_symbols(self):
-        if isinstance(self.stmt_node, ast.Assign):
-            self._handle_assign(self.stmt_node)
-        else:
+        handler = self._LVAL_HANDLERS_BY_STMT_TYPE.get(type(self.stmt_node), None)
+        if handler is None:
             self._make_lval_data_symbols_old()
+        else:
+            handler(self, self.stmt_node)
+
+    def _get_symbol_edges(self) -> List[Tuple[Union[str, ast.AST], ast.AST]]:
+        # the edges depend only on the (immutable) stmt ast and are shared across calls; callers must not mutate them
+        return self._memoize_for_stmt(nbs().symbol_edges_by_stmt_node, get_symbol_edges)
 
     def _make_lval_data_symbols_old(self):
-        symbol_edges = get_symbol_edges(self.stmt_node)
-        should_overwrite = not isinstance(self.stmt_node, ast.AugAssign)
-        is_function_def = isinstance(self.stmt_node, (ast.FunctionDef, ast.AsyncFunctionDef))
-        is_class_def = isinstance(self.stmt_node, ast.ClassDef)
-        is_import = isinstance(self.stmt_node, (ast.Import, ast.ImportFrom))
+        symbol_edges = self._get_symbol_edges()
+        # classify the statement once up front instead of once per target
+        stmt_type = type(self.stmt_node)
+        should_overwrite = stmt_type is not ast.AugAssign
+        is_function_def = stmt_type is ast.FunctionDef or stmt_type is ast.AsyncFunctionDef
+        is_class_def = stmt_type is ast.ClassDef
+        is_import = stmt_type is ast.Import or stmt_type is ast.ImportFrom
+        should_propagate = stmt_type is not ast.For
+        resolve_store_or_del_data_for_target = tracer().resolve_store_or_del_data_for_target
+        store_ctx = ast.Store()
+        # checked once per statement rather than once per symbol edge
+        log_info = logger.isEnabledFor(logging.INFO)
         if is_function_def or is_class_def:
             assert len(symbol_edges) == 1
             # assert not lval_symbol_refs.issubset(rval_symbol_refs)
+        if is_class_def:
+            # register the class namespace once, rather than once per symbol edge
+            assert self.class_scope is not None
+            class_ref = self.frame.f_locals[self.stmt_node.name]
+            class_obj_id = id(class_ref)
+            self.class_scope.obj_id = class_obj_id
+            nbs().namespaces[class_obj_id] = self.class_scope
 
         for target, dep_node in symbol_edges:
             rval_deps = resolve_rval_symbols(dep_node)
-            logger.info('create edges from %s to %s', rval_deps, target)
-            if is_class_def:
-                assert self.class_scope is not None
-                class_ref = self.frame.f_locals[self.stmt_node.name]
-                class_obj_id = id(class_ref)
-                self.class_scope.obj_id = class_obj_id
-                nbs().namespaces[class_obj_id] = self.class_scope
+            if log_info:
+                logger.info('create edges from %s to %s', rval_deps, target)
             try:
-                scope, name, obj, is_subscript = tracer().resolve_store_or_del_data_for_target(target, self.frame, ctx=ast.Store())
+                scope, name, obj, is_subscript = resolve_store_or_del_data_for_target(target, self.frame, ctx=store_ctx)
                 scope.upsert_data_symbol_for_name(
                     name, obj, rval_deps, self.stmt_node,
                     overwrite=should_overwrite,
@@ -213,7 +284,7 @@ class TraceStatement:
                     is_function_def=is_function_def,
                     is_import=is_import,
                     class_scope=self.class_scope,
-                    propagate=not isinstance(self.stmt_node, ast.For)
+                    propagate=should_propagate,
                 )
             except KeyError:
                 logger.warning('keyerror for %s', target)
@@ -222,26 +293,32 @@ class TraceStatement:
                 pass
 
     def handle_dependencies(self):
-        if not nbs().dependency_tracking_enabled:
+        safety = nbs()
+        if not safety.dependency_tracking_enabled:
             return
+        # checked once per statement rather than once per mutation
+        log_info = logger.isEnabledFor(logging.INFO)
         for mutated_obj_id, mutation_event, mutation_arg_dsyms, mutation_arg_objs in tracer().mutations:
-            logger.info("mutation %s %s %s %s", mutated_obj_id, mutation_event, mutation_arg_dsyms, mutation_arg_objs)
-            update_usage_info(mutation_arg_dsyms)
+            if log_info:
+                logger.info(
+                    "mutation %s %s %s %s", mutated_obj_id, mutation_event, mutation_arg_dsyms, mutation_arg_objs
+                )
             if mutation_event == MutationEvent.arg_mutate:
+                update_usage_info(mutation_arg_dsyms)
                 for mutated_sym in mutation_arg_dsyms:
                     if mutated_sym is None:
                         continue
                     # TODO: happens when module mutates args
                     #  should we add module as a dep in this case?
-                    mutated_sym.update_deps(set(), overwrite=False, mutated=True)
+                    mutated_sym.update_deps(EMPTY_DEPS, overwrite=False, mutated=True)
                 continue
 
             # NOTE: this next block is necessary to ensure that we add the argument as a namespace child
             # of the mutated symbol. This helps to avoid propagating through to dependency children that are
             # themselves namespace children.
             if mutation_event == MutationEvent.list_append and len(mutation_arg_objs) == 1:
-                namespace_scope = nbs().namespaces.get(mutated_obj_id, None)
-                mutated_sym = nbs().get_first_full_symbol(mutated_obj_id)
+                namespace_scope = safety.namespaces.get(mutated_obj_id, None)
+                mutated_sym = safety.get_first_full_symbol(mutated_obj_id)
                 if mutated_sym is not None:
                     mutated_obj = mutated_sym.get_obj()
                     mutation_arg_obj = next(iter(mutation_arg_objs))
@@ -253,7 +330,8 @@ class TraceStatement:
                                 mutated_sym.name,
                                 parent_scope=mutated_sym.containing_scope
                             )
-                        logger.info("upsert %s to %s", len(mutated_obj) - 1, namespace_scope)
+                        if log_info:
+                            logger.info("upsert %s to %s", len(mutated_obj) - 1, namespace_scope)
                         namespace_scope.upsert_data_symbol_for_name(
                             len(mutated_obj) - 1,
                             mutation_arg_obj,
@@ -264,8 +342,10 @@ class TraceStatement:
                             propagate=False
                         )
             # TODO: add mechanism for skipping namespace children in case of list append
-            update_usage_info(nbs().aliases[mutated_obj_id])
-            for mutated_sym in nbs().aliases[mutated_obj_id]:
+            aliases = safety.aliases[mutated_obj_id]
+            # the mutation args and the mutated obj's aliases share a usage timestamp; bump both in one pass
+            update_usage_info(mutation_arg_dsyms | aliases)
+            for mutated_sym in aliases:
                 mutated_sym.update_deps(mutation_arg_dsyms, overwrite=False, mutated=True)
         if self._contains_lval():
             self._make_lval_data_symbols()
@@ -276,11 +356,17 @@ class TraceStatement:
             resolve_rval_symbols(self.stmt_node)
 
     def finished_execution_hook(self):
-        if self.finished:
+        # a single hash op both checks whether the stmt already finished and marks it as finished
+        seen_stmts = tracer().seen_stmts
+        num_seen_stmts = len(seen_stmts)
+        seen_stmts.add(self.stmt_id)
+        if len(seen_stmts) == num_seen_stmts:
             return
         # print('finishing stmt', self.stmt_node)
-        tracer().seen_stmts.add(self.stmt_id)
         self.handle_dependencies()
         tracer().after_stmt_reset_hook()
-        nbs()._namespace_gc()
+        safety = nbs()
+        # pending garbage namespaces act as the dirty flag; most statements don't produce any
+        if len(safety.garbage_namespace_obj_ids) > 0:
+            safety._namespace_gc()
         # self.safety._gc()
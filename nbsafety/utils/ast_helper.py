@@ -29,8 +29,10 @@ class FastAst:
 
 
 def _make_func(func_name):
+    ast_ctor = getattr(ast, func_name)
+
     def ctor(*args, **kwargs):
-        ret = getattr(ast, func_name)(*args, **kwargs)
+        ret = ast_ctor(*args, **kwargs)
         if FastAst._LOCATION_OF_NODE is not None:
             ast.copy_location(ret, FastAst._LOCATION_OF_NODE)
         return ret
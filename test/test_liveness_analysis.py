@@ -52,6 +52,13 @@ def test_subscript_is_live():
     assert live == {'bar', 'baz'}
 
 
+def test_nested_and_starred_assign_targets():
+    live, dead = compute_live_dead_symbol_refs('a, (b, [c, *d]), foo[e] = f')
+    live, dead = _remove_callpoints(live), _remove_callpoints(dead)
+    assert live == {'e', 'f'}
+    assert dead == {'a', 'b', 'c', 'd'}
+
+
 if sys.version_info >= (3, 8):
     def test_walrus():
         live, dead = compute_live_dead_symbol_refs("""
@@ -53,6 +53,40 @@ def test_simple():
     assert response['refresher_links'] == {1: [3]}
 
 
+def test_simple_naive_refresher_computation():
+    cells = {
+        0: 'x = 0',
+        1: 'y = x + 1',
+        2: 'x = 42',
+        3: 'logging.info(y)',
+    }
+    run_cell(cells[0])
+    run_cell(cells[1])
+    run_cell(cells[2])
+    with override_settings(naive_refresher_computation=True):
+        response = nbs().check_and_link_multiple_cells(cells)
+    assert response['stale_cells'] == [3]
+    assert response['fresh_cells'] == []
+    assert response['stale_links'] == {3: [1]}
+    assert response['refresher_links'] == {1: [3]}
+
+
+def test_transitive_stale_links():
+    cells = {
+        0: 'x = 0',
+        1: 'y = x + 1',
+        2: 'z = y + 1',
+        3: 'x = 42',
+        4: 'logging.info(z)',
+    }
+    for i in range(4):
+        run_cell(cells[i])
+    response = nbs().check_and_link_multiple_cells(cells)
+    assert sorted(response['stale_cells']) == [2, 4]
+    assert response['stale_links'] == {2: [1], 4: [1]}
+    assert sorted(response['refresher_links'][1]) == [2, 4]
+
+
 def test_refresh_after_exception_fixed():
     cells = {
         0: 'x = 0',
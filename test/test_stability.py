@@ -1,6 +1,7 @@
 # -*- coding: future_annotations -*-
 import logging
 
+from nbsafety.singletons import nbs
 from .utils import make_safety_fixture, skipif_known_failing
 
 logging.basicConfig(level=logging.ERROR)
@@ -86,6 +87,17 @@ def test_delete():
     run_cell('del lst[-1]')
 
 
+def test_delete_names():
+    run_cell('x = 0')
+    run_cell('lst = list(range(10))')
+    run_cell('y = x + 1')
+    run_cell('del x, lst[0]')
+    assert nbs().global_scope.lookup_data_symbol_by_name_this_indentation('x') is None
+    assert nbs().global_scope.lookup_data_symbol_by_name_this_indentation('y') is not None
+    run_cell('del y')
+    assert nbs().global_scope.lookup_data_symbol_by_name_this_indentation('y') is None
+
+
 def test_delitem():
     run_cell("""
 class Foo:
@@ -952,6 +952,27 @@ class Foo:
     assert_detected('`foo.x` depends on stale `bar.y`')
 
 
+def test_stale_use_of_attribute_with_slots():
+    run_cell("""
+class Foo:
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+""")
+    run_cell('foo = Foo(5, 6)')
+    run_cell('bar = Foo(7, 8)')
+    run_cell('foo.x = bar.x + bar.y')
+    run_cell('logging.info(foo.y)')
+    assert_not_detected()
+    run_cell('bar.y = 42')
+    run_cell('logging.info(foo.x)')
+    assert_detected('`foo.x` depends on stale `bar.y`')
+    run_cell('logging.info(foo.y)')
+    assert_not_detected('`foo.y` does not depend on `bar.y`')
+
+
 def test_attr_manager_active_scope_resets():
     run_cell("""
 y = 10
@@ -1661,6 +1682,21 @@ def test_unpack_multiple_from_single():
     assert_detected()
 
 
+def test_starred_unpack_from_single():
+    run_cell('x, y = 0, 1')
+    run_cell('lst = [x + 1, y + 1]')
+    run_cell('a, *rest = lst')
+    run_cell('b, *empty = [y + 2]')
+    assert nbs().global_scope.lookup_data_symbol_by_name_this_indentation('empty') is not None
+    run_cell('x = 42')
+    run_cell('logging.info(empty)')
+    assert_not_detected('`empty` captured nothing from the rhs')
+    run_cell('logging.info(rest)')
+    assert_not_detected('`rest` does not depend on `x`')
+    run_cell('logging.info(a)')
+    assert_detected('`a` depends on stale `x`')
+
+
 @skipif_known_failing
 def test_attr_dep_with_top_level_overwrite():
     run_cell("""